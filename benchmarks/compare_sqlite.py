@@ -16,6 +16,14 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from dbbasic import TSV
 
 
+def configure_sqlite(conn: sqlite3.Connection):
+    """Apply the usual production PRAGMAs for a fair comparison"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-200000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
 class Benchmark:
     """Base benchmark class"""
 
@@ -44,18 +52,21 @@ class TSVInsertBenchmark(Benchmark):
         self.num_records = num_records
         self.db = TSV("benchmark", ["id", "name", "email", "age", "created"])
 
-    def execute(self):
-        records = [
+        # Generate up front so only the insert itself is timed
+        now = str(time.time())
+        self.records = [
             {
                 "id": str(i),
                 "name": f"User_{i}",
                 "email": f"user{i}@example.com",
                 "age": str(20 + (i % 50)),
-                "created": str(time.time())
+                "created": now
             }
-            for i in range(self.num_records)
+            for i in range(num_records)
         ]
-        self.db.insert_many(records)
+
+    def execute(self):
+        self.db.insert_many(self.records)
 
     def cleanup(self):
         self.db.drop()
@@ -69,6 +80,7 @@ class SQLiteInsertBenchmark(Benchmark):
         self.num_records = num_records
         self.db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
         self.conn = sqlite3.connect(self.db_file.name)
+        configure_sqlite(self.conn)
         self.conn.execute("""
             CREATE TABLE benchmark (
                 id TEXT PRIMARY KEY,
@@ -79,14 +91,17 @@ class SQLiteInsertBenchmark(Benchmark):
             )
         """)
 
-    def execute(self):
-        records = [
-            (str(i), f"User_{i}", f"user{i}@example.com", 20 + (i % 50), time.time())
-            for i in range(self.num_records)
+        # Generate up front so only the insert itself is timed
+        now = time.time()
+        self.records = [
+            (str(i), f"User_{i}", f"user{i}@example.com", 20 + (i % 50), now)
+            for i in range(num_records)
         ]
+
+    def execute(self):
         self.conn.executemany(
             "INSERT INTO benchmark VALUES (?, ?, ?, ?, ?)",
-            records
+            self.records
         )
         self.conn.commit()
 
@@ -111,9 +126,11 @@ class TSVQueryBenchmark(Benchmark):
         ]
         self.db.insert_many(records)
 
+        # Lookup keys computed outside the timed region
+        self._query_ids = [str(i % num_records) for i in range(num_queries)]
+
     def execute(self):
-        for i in range(self.num_queries):
-            query_id = str(i % self.num_records)
+        for query_id in self._query_ids:
             result = self.db.query_one(id=query_id)
 
     def cleanup(self):
@@ -129,6 +146,7 @@ class SQLiteQueryBenchmark(Benchmark):
         self.num_queries = num_queries
         self.db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
         self.conn = sqlite3.connect(self.db_file.name)
+        configure_sqlite(self.conn)
 
         # Create table and index
         self.conn.execute("""
@@ -141,18 +159,20 @@ class SQLiteQueryBenchmark(Benchmark):
         """)
         self.conn.execute("CREATE INDEX idx_id ON query_bench(id)")
 
-        # Pre-populate
-        records = [
+        # Pre-populate (streamed, no intermediate list)
+        records = (
             (str(i), f"User_{i}", f"user{i}@example.com", 20 + (i % 50))
             for i in range(num_records)
-        ]
+        )
         self.conn.executemany("INSERT INTO query_bench VALUES (?, ?, ?, ?)", records)
         self.conn.commit()
 
+        # Lookup keys computed outside the timed region
+        self._query_ids = [str(i % num_records) for i in range(num_queries)]
+
     def execute(self):
         cursor = self.conn.cursor()
-        for i in range(self.num_queries):
-            query_id = str(i % self.num_records)
+        for query_id in self._query_ids:
             cursor.execute("SELECT * FROM query_bench WHERE id = ?", (query_id,))
             result = cursor.fetchone()
 
@@ -264,9 +284,10 @@ def run_comparison():
 
     # Create TSV with data
     tsv_test = TSV("size_test", ["id", "name", "email", "age", "created"])
+    now = time.time()
     records = [
         {"id": str(i), "name": f"User_{i}", "email": f"user{i}@example.com",
-         "age": str(20 + (i % 50)), "created": str(time.time())}
+         "age": str(20 + (i % 50)), "created": str(now)}
         for i in range(10000)
     ]
     tsv_test.insert_many(records)
@@ -289,10 +310,10 @@ def run_comparison():
             created REAL
         )
     """)
-    sqlite_records = [
-        (str(i), f"User_{i}", f"user{i}@example.com", 20 + (i % 50), time.time())
+    sqlite_records = (
+        (str(i), f"User_{i}", f"user{i}@example.com", 20 + (i % 50), now)
         for i in range(10000)
-    ]
+    )
     conn.executemany("INSERT INTO size_test VALUES (?, ?, ?, ?, ?)", sqlite_records)
     conn.commit()
     conn.close()
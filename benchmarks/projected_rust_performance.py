@@ -50,9 +50,10 @@ def run_benchmarks():
         print("-" * 60)
 
         # Generate test data
+        created = str(time.time())
         records = [
             {"id": str(i), "name": f"User_{i}", "email": f"user{i}@example.com",
-             "age": str(20 + (i % 50)), "created": str(time.time())}
+             "age": str(20 + (i % 50)), "created": created}
             for i in range(size)
         ]
 
@@ -69,9 +70,10 @@ def run_benchmarks():
 
         # Query performance
         query_count = min(100, size // 10)
+        query_ids = [str(i * 10 % size) for i in range(query_count)]
         start = time.perf_counter()
-        for i in range(query_count):
-            py_tsv.query_one(id=str(i * 10 % size))
+        for query_id in query_ids:
+            py_tsv.query_one(id=query_id)
         py_query_time = time.perf_counter() - start
         py_query_rate = query_count / py_query_time
 
@@ -93,6 +95,10 @@ def run_benchmarks():
         print("\n🗄️  SQLite:")
         db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
         conn = sqlite3.connect(db_file.name)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-200000")
+        conn.execute("PRAGMA temp_store=MEMORY")
         conn.execute("""
             CREATE TABLE bench (
                 id TEXT PRIMARY KEY,
@@ -119,8 +125,8 @@ def run_benchmarks():
         # SQLite query
         cursor = conn.cursor()
         start = time.perf_counter()
-        for i in range(query_count):
-            cursor.execute("SELECT * FROM bench WHERE id = ?", (str(i * 10 % size),))
+        for query_id in query_ids:
+            cursor.execute("SELECT * FROM bench WHERE id = ?", (query_id,))
             cursor.fetchone()
         sqlite_query_time = time.perf_counter() - start
         sqlite_query_rate = query_count / sqlite_query_time
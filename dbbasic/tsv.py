@@ -4,9 +4,12 @@ Simple, robust TSV database
 Focus on reliability over complexity
 """
 
+import io
 import os
 import csv
 import json
+import mmap
+import marshal
 import time
 import fcntl
 import hashlib
@@ -15,12 +18,18 @@ import threading
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict, OrderedDict
-from typing import Dict, List, Optional, Any, Iterator
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Sequence
 from contextlib import contextmanager
 
 # Configure CSV for large fields
 csv.field_size_limit(min(2**31-1, os.sysconf('SC_ARG_MAX')))
 
+# Bytes of the mapped data file decoded per step when scanning
+_SCAN_CHUNK = 1 << 20
+
+# Leading bytes of a binary .idx file - bump the digit if the layout changes
+_INDEX_MAGIC = b'DBTSVIX1'
+
 
 class TSV:
     """
@@ -54,6 +63,21 @@ class TSV:
         # Transaction state
         self._in_transaction = False
 
+        # Read-only map of the data file, shared by scans. The state is the
+        # file's stat plus a count of our own writes, since a same-size
+        # rewrite within one mtime tick doesn't change the stat
+        self._mm = None
+        self._mm_state = None
+        self._writes = 0
+
+        # Column-oriented copy of the rows, built on the first scan query
+        self._columns = None
+        self._columns_state = None
+
+        # Lazy per-column hash indexes over the columnar copy
+        self._col_indexes: Dict[str, Dict[str, List[int]]] = {}
+        self._col_indexes_state = None
+
         # Initialize
         self._init_table()
         self._load_index()
@@ -115,12 +139,15 @@ class TSV:
 
                 if index_mtime >= data_mtime:
                     # Index is current, load it
-                    with open(self.index_file, 'r') as f:
-                        data = json.load(f)
-                        self.index = defaultdict(list, data.get('index', {}))
-                        self.row_count = data.get('row_count', 0)
+                    with open(self.index_file, 'rb') as f:
+                        if f.read(len(_INDEX_MAGIC)) != _INDEX_MAGIC:
+                            raise ValueError("not a binary index file")
+                        row_count, index, _updated = marshal.load(f)
+                    self.index = defaultdict(list, index)
+                    self.row_count = row_count
                     return
-            except (json.JSONDecodeError, KeyError, OSError):
+            except (OSError, EOFError, ValueError, TypeError):
+                # Old JSON or corrupt index - fall through to a rebuild
                 pass
 
         # Rebuild index from data (either missing, corrupt, or stale)
@@ -149,17 +176,14 @@ class TSV:
         self._save_index()
 
     def _save_index(self):
-        """Save index to file"""
-        data = {
-            'index': dict(self.index),
-            'row_count': self.row_count,
-            'updated': datetime.utcnow().isoformat()
-        }
+        """Save index to file (magic header + marshal payload)"""
+        data = (self.row_count, dict(self.index), datetime.utcnow().isoformat())
 
         # Write atomically
         temp_file = self.index_file.with_suffix('.tmp')
-        with open(temp_file, 'w') as f:
-            json.dump(data, f)
+        with open(temp_file, 'wb') as f:
+            f.write(_INDEX_MAGIC)
+            marshal.dump(data, f)
 
         temp_file.replace(self.index_file)
 
@@ -175,6 +199,7 @@ class TSV:
                     writer = csv.DictWriter(f, fieldnames=self.columns,
                                           delimiter='\t', quoting=csv.QUOTE_MINIMAL)
                     writer.writerow(record)
+                self._data_changed()
 
                 # Update index
                 if self.columns and self.columns[0] in record:
@@ -196,31 +221,53 @@ class TSV:
 
     def insert_many(self, records: List[Dict[str, Any]]) -> int:
         """Insert multiple records efficiently"""
+        columns = tuple(self.columns)
+        blanks = ('',) * len(columns)
+        return self._write_rows(
+            list(map(record.get, columns, blanks)) for record in records
+        )
+
+    def insert_many_rows(self, rows: Iterable[Sequence[Any]]) -> int:
+        """Insert positional rows whose values follow self.columns order
+
+        Short rows are padded with empty values, extra values are dropped.
+        """
+        return self._write_rows(rows)
+
+    def _write_rows(self, rows: Iterable[Sequence[Any]]) -> int:
+        """Append positional rows with the csv writer and index them"""
         with self._lock():
             inserted = 0
+            width = len(self.columns)
+            start_row = self.row_count
 
             try:
                 with open(self.data_file, 'a', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=self.columns,
-                                          delimiter='\t', quoting=csv.QUOTE_MINIMAL)
-
-                    for record in records:
-                        record = self._normalize_record(record)
-                        writer.writerow(record)
+                    # Bind everything the loop touches to locals
+                    writerow = csv.writer(f, delimiter='\t', quoting=csv.QUOTE_MINIMAL).writerow
+                    normalize = self._normalize_value
+                    index = self.index
+                    padding = [''] * width
+
+                    for row in rows:
+                        values = list(map(normalize, row[:width]))
+                        if len(values) < width:
+                            values += padding[len(values):]
+                        writerow(values)
 
                         # Update index
-                        if self.columns and self.columns[0] in record:
-                            key = record[self.columns[0]]
-                            if key:
-                                self.index[key].append(self.row_count)
+                        if values and values[0]:
+                            index[values[0]].append(start_row + inserted)
 
-                        self.row_count += 1
                         inserted += 1
 
+                self.row_count = start_row + inserted
+                self._data_changed()
                 self._save_index()
                 return inserted
 
             except Exception as e:
+                self.row_count = start_row + inserted
                 print(f"Batch insert error: {e}")
                 return inserted
 
@@ -243,24 +290,40 @@ class TSV:
                 if key in self.index:
                     row_nums = self.index[key]
 
-                    with open(self.data_file, 'r', encoding='utf-8') as f:
-                        reader = list(csv.DictReader(f, delimiter='\t'))
+                    reader = list(csv.DictReader(self._iter_lines(), delimiter='\t'))
 
-                        for row_num in row_nums:
-                            if row_num < len(reader):
-                                row = reader[row_num]
-                                if self._matches_conditions(row, conditions):
-                                    results.append(row)
-                                    # Cache result
-                                    self._add_to_cache(key, row)
+                    for row_num in row_nums:
+                        if row_num < len(reader):
+                            row = reader[row_num]
+                            if self._matches_conditions(row, conditions):
+                                results.append(row)
+                                # Cache result
+                                self._add_to_cache(key, row)
             else:
-                # Full scan
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f, delimiter='\t')
-
-                    for row in reader:
-                        if self._matches_conditions(row, conditions):
-                            results.append(row)
+                # Column scan - each condition touches only its own column
+                columns = self._load_columns()
+                if any(key not in columns for key in conditions):
+                    return results
+
+                names = list(columns)
+                data = list(columns.values())
+                matches = None
+
+                # Intersect row sets from each condition's column index
+                for key, value in conditions.items():
+                    wanted = str(value) if value is not None else ''
+                    rows = self._column_index(key).get(wanted, ())
+                    matches = set(rows) if matches is None else matches.intersection(rows)
+                    if not matches:
+                        break
+
+                if matches is None:
+                    matches = range(len(data[0]) if data else 0)
+                else:
+                    matches = sorted(matches)
+
+                for i in matches:
+                    results.append(dict(zip(names, [values[i] for values in data])))
 
         return results
 
@@ -294,6 +357,7 @@ class TSV:
             if updated > 0:
                 # Write back atomically
                 self._write_all(records)
+                self._data_changed()
                 # Rebuild index since row positions might change
                 self._rebuild_index()
 
@@ -323,6 +387,7 @@ class TSV:
             if deleted > 0:
                 # Write back atomically
                 self._write_all(records)
+                self._data_changed()
                 # Rebuild index
                 self._rebuild_index()
 
@@ -338,10 +403,9 @@ class TSV:
     def all(self) -> Iterator[Dict[str, Any]]:
         """Iterate over all records"""
         with self._lock(exclusive=False):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f, delimiter='\t')
-                for row in reader:
-                    yield row
+            reader = csv.DictReader(self._iter_lines(), delimiter='\t')
+            for row in reader:
+                yield row
 
     def truncate(self):
         """Remove all records but keep structure"""
@@ -350,6 +414,7 @@ class TSV:
                 writer = csv.writer(f, delimiter='\t', quoting=csv.QUOTE_MINIMAL)
                 writer.writerow(self.columns)
 
+            self._data_changed()
             self.index.clear()
             self.cache.clear()
             self.row_count = 0
@@ -382,6 +447,7 @@ class TSV:
                 if backup_file.exists():
                     shutil.copy2(backup_file, file)
 
+            self._data_changed()
             self._load_index()
             self.cache.clear()
 
@@ -465,6 +531,7 @@ class TSV:
             # Transaction failed - rollback by restoring from backup
             if backup_file.exists():
                 shutil.copy2(backup_file, self.data_file)
+                self._data_changed()
                 backup_file.unlink()
                 # Rebuild index after rollback (index is now stale)
                 self._rebuild_index()
@@ -475,28 +542,106 @@ class TSV:
             fcntl.flock(lock_fd, fcntl.LOCK_UN)
             os.close(lock_fd)
 
-    def _normalize_record(self, record: Dict[str, Any]) -> Dict[str, str]:
-        """Normalize record for TSV storage"""
-        normalized = {}
-
-        for col in self.columns:
-            value = record.get(col, '')
-
-            # Convert to string
-            if value is None:
-                value = ''
-            elif isinstance(value, bool):
-                value = '1' if value else '0'
-            elif isinstance(value, (list, dict)):
-                value = json.dumps(value)
-            else:
-                value = str(value)
+    def _data_changed(self):
+        """Invalidate the map and everything built from it after a write"""
+        self._mm = None
+        self._writes += 1
+
+    def _data_map(self) -> Optional[mmap.mmap]:
+        """Map the data file read-only, remapping when it has changed on disk"""
+        st = os.stat(self.data_file)
+        state = (st.st_ino, st.st_size, st.st_mtime_ns, self._writes)
+
+        if self._mm is None or self._mm_state != state:
+            # Drop the old map rather than close it - a running scan may still hold it
+            self._mm = None
+            self._mm_state = state
+            if st.st_size == 0:
+                return None
+            with open(self.data_file, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self._mm
+
+    def _iter_lines(self) -> Iterator[str]:
+        """Yield the data file's lines (header included) from the shared map"""
+        mm = self._data_map()
+        if mm is None:
+            return
 
-            # Clean up for TSV
-            value = value.replace('\t', '    ').replace('\n', ' ').replace('\r', '')
-            normalized[col] = value
+        # Decode about a megabyte at a time, cut at a newline, and let
+        # StringIO split it - one decode per chunk instead of per line
+        end = len(mm)
+        pos = 0
+        while pos < end:
+            limit = pos + _SCAN_CHUNK
+            if limit >= end:
+                stop = end
+            else:
+                nl = mm.rfind(b'\n', pos, limit)
+                if nl < 0:
+                    nl = mm.find(b'\n', limit)
+                stop = end if nl < 0 else nl + 1
+            yield from io.StringIO(mm[pos:stop].decode('utf-8'))
+            pos = stop
+
+    def _load_columns(self) -> Dict[str, List[str]]:
+        """Table contents as one list per column, rebuilt when the data file changes"""
+        self._data_map()
+        if self._columns is None or self._columns_state != self._mm_state:
+            reader = csv.reader(self._iter_lines(), delimiter='\t')
+            header = next(reader, [])
+            width = len(header)
+
+            # Pad short rows the way DictReader does so columns stay aligned
+            rows = [row if len(row) == width else (row + [None] * width)[:width]
+                    for row in reader if row]
+            values = [list(col) for col in zip(*rows)] if rows else [[] for _ in header]
+
+            self._columns = dict(zip(header, values))
+            self._columns_state = self._mm_state
+
+        return self._columns
+
+    def _column_index(self, column: str) -> Dict[str, List[int]]:
+        """Hash index of one column's values to row numbers, built on first use"""
+        self._load_columns()
+        if self._col_indexes_state != self._columns_state:
+            self._col_indexes = {}
+            self._col_indexes_state = self._columns_state
+
+        index = self._col_indexes.get(column)
+        if index is None:
+            index = self._col_indexes[column] = self._build_column_index(column)
+        return index
+
+    def _build_column_index(self, column: str) -> Dict[str, List[int]]:
+        """Group row numbers by value for one column"""
+        index = {}
+        for i, value in enumerate(self._columns[column]):
+            index.setdefault(value, []).append(i)
+        return index
 
-        return normalized
+    def _normalize_record(self, record: Dict[str, Any]) -> Dict[str, str]:
+        """Normalize record for TSV storage"""
+        return {col: self._normalize_value(record.get(col, '')) for col in self.columns}
+
+    def _normalize_value(self, value: Any) -> str:
+        """Normalize a single value for TSV storage"""
+        # Convert to string (plain str, the common case, needs nothing)
+        if type(value) is str:
+            pass
+        elif value is None:
+            value = ''
+        elif isinstance(value, bool):
+            value = '1' if value else '0'
+        elif isinstance(value, (list, dict)):
+            value = json.dumps(value)
+        else:
+            value = str(value)
+
+        # Clean up for TSV
+        return value.replace('\t', '    ').replace('\n', ' ').replace('\r', '')
 
     def _matches_conditions(self, row: Dict[str, Any], conditions: Dict[str, Any]) -> bool:
         """Check if row matches all conditions"""
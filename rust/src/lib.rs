@@ -1,25 +1,34 @@
 use pyo3::prelude::*;
+use pyo3::types::{PyBool, PyDict, PyList, PyString, PyTuple};
 use rayon::prelude::*;
+use std::borrow::Cow;
+use std::cell::RefCell;
 use std::collections::HashMap;
 use ahash::{AHashMap, AHashSet};
 use std::fs::{File, OpenOptions};
-use std::io::{BufReader, BufWriter, BufRead, Write};
-use memchr::memchr_iter;
+use std::io::{self, BufReader, BufRead, Read, Write};
+use std::path::PathBuf;
+use std::sync::{Arc, RwLock};
+use std::time::SystemTime;
+use memchr::{memchr, memchr2_iter, memchr3, memchr_iter};
+use memmap2::Mmap;
+#[cfg(unix)]
+use memmap2::Advice;
 
-/// Ultra-fast TSV line parser using memchr for tab finding
-#[pyfunction]
-fn parse_tsv_line_fast(line: &str, columns: Vec<String>) -> PyResult<HashMap<String, String>> {
+/// Parse one TSV line (without its newline) into a column -> value map
+///
+/// A trailing `\r` (csv's `\r\n` line ending) is dropped and quoted
+/// fields are unquoted, so this agrees with `scan_rows` + `row_map`.
+fn parse_line_bytes(bytes: &[u8], columns: &[String]) -> HashMap<String, String> {
+    let bytes = trim_cr(bytes);
     let mut result = HashMap::with_capacity(columns.len());
-    let bytes = line.as_bytes();
     let mut last_pos = 0;
     let mut col_idx = 0;
 
     // Use memchr to find tabs - much faster than split()
     for tab_pos in memchr_iter(b'\t', bytes) {
         if col_idx < columns.len() {
-            let value = std::str::from_utf8(&bytes[last_pos..tab_pos])
-                .unwrap_or("")
-                .to_string();
+            let value = field_string(&bytes[last_pos..tab_pos]);
             result.insert(columns[col_idx].clone(), value);
             col_idx += 1;
         }
@@ -27,77 +36,403 @@ fn parse_tsv_line_fast(line: &str, columns: Vec<String>) -> PyResult<HashMap<Str
     }
 
     // Handle last field
-    if col_idx < columns.len() && last_pos < bytes.len() {
-        let value = std::str::from_utf8(&bytes[last_pos..])
-            .unwrap_or("")
-            .to_string();
+    if col_idx < columns.len() {
+        let value = field_string(&bytes[last_pos..]);
         result.insert(columns[col_idx].clone(), value);
+        col_idx += 1;
     }
 
     // Fill remaining columns with empty strings
-    for i in (col_idx + 1)..columns.len() {
-        result.insert(columns[i].clone(), String::new());
+    for col in &columns[col_idx..] {
+        result.insert(col.clone(), String::new());
+    }
+
+    result
+}
+
+/// Drop the `\r` a csv `\r\n` line ending leaves behind
+fn trim_cr(line: &[u8]) -> &[u8] {
+    match line.split_last() {
+        Some((b'\r', rest)) => rest,
+        _ => line,
     }
+}
 
-    Ok(result)
+/// Decode one raw field, undoing csv quoting (invalid UTF-8 reads as empty)
+fn field_string(field: &[u8]) -> String {
+    std::str::from_utf8(&unquote(field)).unwrap_or("").to_string()
 }
 
-/// Batch parse TSV lines in parallel with pre-allocation
+/// Return the n-th tab-separated field of a line, if present
+fn nth_field(bytes: &[u8], n: usize) -> Option<&[u8]> {
+    let mut start = 0;
+    let mut field = 0;
+
+    for tab_pos in memchr_iter(b'\t', bytes) {
+        if field == n {
+            return Some(&bytes[start..tab_pos]);
+        }
+        field += 1;
+        start = tab_pos + 1;
+    }
+
+    if field == n {
+        Some(&bytes[start..])
+    } else {
+        None
+    }
+}
+
+/// Split one TSV line into exactly `ncols` positional fields
+fn split_fields(bytes: &[u8], ncols: usize) -> Vec<String> {
+    let mut fields = Vec::with_capacity(ncols);
+    let mut last_pos = 0;
+
+    for tab_pos in memchr_iter(b'\t', bytes) {
+        if fields.len() == ncols {
+            break;
+        }
+        fields.push(String::from_utf8_lossy(&unquote(&bytes[last_pos..tab_pos])).into_owned());
+        last_pos = tab_pos + 1;
+    }
+
+    if fields.len() < ncols {
+        fields.push(String::from_utf8_lossy(&unquote(&bytes[last_pos..])).into_owned());
+    }
+    fields.resize(ncols, String::new());
+
+    fields
+}
+
+/// Ultra-fast TSV line parser using memchr for tab finding
 #[pyfunction]
-fn parse_tsv_batch_fast(lines: Vec<String>, columns: Vec<String>) -> PyResult<Vec<HashMap<String, String>>> {
-    let column_refs: Vec<&str> = columns.iter().map(|s| s.as_str()).collect();
+fn parse_tsv_line_fast(line: &str, columns: Vec<String>) -> PyResult<HashMap<String, String>> {
+    Ok(parse_line_bytes(line.as_bytes(), &columns))
+}
 
-    let results: Vec<HashMap<String, String>> = lines
+/// Batch parse TSV lines in parallel
+///
+/// Each line is parsed by `parse_line_bytes`, so results match
+/// `parse_tsv_line_fast` line for line.
+#[pyfunction]
+fn parse_tsv_batch_fast(lines: Vec<String>, columns: Vec<String>) -> PyResult<Vec<HashMap<String, String>>> {
+    Ok(lines
         .par_iter()
-        .map(|line| {
-            let mut record = HashMap::with_capacity(columns.len());
-            let bytes = line.as_bytes();
-            let mut last_pos = 0;
-            let mut col_idx = 0;
-
-            for tab_pos in memchr_iter(b'\t', bytes) {
-                if col_idx < column_refs.len() {
-                    let value = std::str::from_utf8(&bytes[last_pos..tab_pos])
-                        .unwrap_or("")
-                        .to_string();
-                    record.insert(column_refs[col_idx].to_string(), value);
-                    col_idx += 1;
-                }
-                last_pos = tab_pos + 1;
-            }
+        .map(|line| parse_line_bytes(line.as_bytes(), &columns))
+        .collect())
+}
 
-            if col_idx < column_refs.len() && last_pos < bytes.len() {
-                let value = std::str::from_utf8(&bytes[last_pos..])
-                    .unwrap_or("")
-                    .to_string();
-                record.insert(column_refs[col_idx].to_string(), value);
+/// Return the line starting at `offset` (without its newline)
+fn line_at(data: &[u8], offset: usize) -> Option<&[u8]> {
+    if offset >= data.len() {
+        return None;
+    }
+    let rest = &data[offset..];
+    let end = memchr(b'\n', rest).unwrap_or(rest.len());
+    Some(trim_cr(&rest[..end]))
+}
+
+/// Iterate `(offset, line)` over the data rows of a mapped file, skipping the header
+fn data_lines<'a>(data: &'a [u8]) -> impl Iterator<Item = (usize, &'a [u8])> + 'a {
+    let mut start = memchr(b'\n', data).map_or(data.len(), |p| p + 1);
+    std::iter::from_fn(move || {
+        if start >= data.len() {
+            return None;
+        }
+        let end = memchr(b'\n', &data[start..]).map_or(data.len(), |p| start + p);
+        let item = (start, trim_cr(&data[start..end]));
+        start = end + 1;
+        Some(item)
+    })
+}
+
+/// Resolve `column -> value` conditions to `(column position, value bytes)`
+///
+/// Returns `None` if a condition names an unknown column (nothing can match).
+fn resolve_conditions<'a>(
+    columns: &[String],
+    conditions: &'a HashMap<String, String>
+) -> Option<Vec<(usize, &'a [u8])>> {
+    conditions
+        .iter()
+        .map(|(key, value)| {
+            columns
+                .iter()
+                .position(|c| c == key)
+                .map(|col| (col, value.as_bytes()))
+        })
+        .collect()
+}
+
+/// Walk every data row with one SIMD memchr2 pass over tabs and newlines
+///
+/// Calls `f(line, bounds)` per row, where `bounds[i]` is the end offset of
+/// field `i` within `line`. The bounds vector is reused across rows, so the
+/// scan itself allocates nothing per row.
+fn scan_rows<F>(data: &[u8], mut f: F)
+where
+    F: FnMut(&[u8], &[u32]),
+{
+    let body_start = memchr(b'\n', data).map_or(data.len(), |p| p + 1);
+    let body = &data[body_start..];
+    let mut bounds: Vec<u32> = Vec::with_capacity(32);
+    let mut line_start = 0;
+
+    for pos in memchr2_iter(b'\t', b'\n', body) {
+        bounds.push((pos - line_start) as u32);
+        if body[pos] == b'\n' {
+            emit_row(&body[line_start..pos], &mut bounds, &mut f);
+            bounds.clear();
+            line_start = pos + 1;
+        }
+    }
+
+    // Last line without a trailing newline
+    if line_start < body.len() {
+        bounds.push((body.len() - line_start) as u32);
+        emit_row(&body[line_start..], &mut bounds, &mut f);
+    }
+}
+
+/// Hand one split row to `f`, dropping the `\r` of a csv `\r\n` line ending
+fn emit_row<F>(line: &[u8], bounds: &mut [u32], f: &mut F)
+where
+    F: FnMut(&[u8], &[u32]),
+{
+    match line.split_last() {
+        Some((b'\r', rest)) => {
+            if let Some(last) = bounds.last_mut() {
+                *last -= 1;
             }
+            f(rest, bounds)
+        }
+        _ => f(line, bounds),
+    }
+}
+
+/// Undo csv quoting: `"a""b"` reads back as `a"b`
+///
+/// Only fields that start and end with `"` are quoted; anything else is
+/// returned as is. Unquoted fields (the common case) are never copied.
+fn unquote(field: &[u8]) -> Cow<'_, [u8]> {
+    if field.len() < 2 || field[0] != b'"' || field[field.len() - 1] != b'"' {
+        return Cow::Borrowed(field);
+    }
+    let inner = &field[1..field.len() - 1];
+    if memchr(b'"', inner).is_none() {
+        return Cow::Borrowed(inner);
+    }
+
+    let mut value = Vec::with_capacity(inner.len());
+    let mut quote = false;
+    for &byte in inner {
+        // Keep one quote of each doubled pair
+        if byte == b'"' && quote {
+            quote = false;
+            continue;
+        }
+        quote = byte == b'"';
+        value.push(byte);
+    }
+    Cow::Owned(value)
+}
 
-            record
+/// Field `col` of a row split by `scan_rows`, with csv quoting removed
+fn field_at<'a>(line: &'a [u8], bounds: &[u32], col: usize) -> Option<Cow<'a, [u8]>> {
+    let end = *bounds.get(col)? as usize;
+    let start = if col == 0 { 0 } else { bounds[col - 1] as usize + 1 };
+    Some(unquote(&line[start..end]))
+}
+
+/// Check a split row against resolved conditions without allocating
+fn row_matches(line: &[u8], bounds: &[u32], conditions: &[(usize, &[u8])]) -> bool {
+    conditions
+        .iter()
+        .all(|(col, value)| field_at(line, bounds, *col).map_or(false, |f| f.as_ref() == *value))
+}
+
+/// Materialize a split row as positional fields, padded to `ncols`
+fn row_fields(line: &[u8], bounds: &[u32], ncols: usize) -> Vec<String> {
+    (0..ncols)
+        .map(|col| {
+            field_at(line, bounds, col)
+                .map_or_else(String::new, |v| String::from_utf8_lossy(&v).into_owned())
         })
-        .collect();
+        .collect()
+}
 
-    Ok(results)
+/// Materialize a split row as a column -> value map
+fn row_map(line: &[u8], bounds: &[u32], columns: &[String]) -> HashMap<String, String> {
+    columns
+        .iter()
+        .enumerate()
+        .map(|(col, name)| {
+            let value = field_at(line, bounds, col)
+                .map_or_else(String::new, |v| String::from_utf8_lossy(&v).into_owned());
+            (name.clone(), value)
+        })
+        .collect()
 }
 
-/// Build an index from records using AHash (fastest hash map)
-#[pyfunction]
-fn build_index(
-    records: Vec<HashMap<String, String>>,
-    index_column: String
-) -> PyResult<HashMap<String, Vec<usize>>> {
-    let mut index: AHashMap<String, Vec<usize>> = AHashMap::new();
+/// Split the data rows into about `n` chunks that each end on a line boundary
+fn line_chunks(data: &[u8], n: usize) -> Vec<&[u8]> {
+    let body_start = memchr(b'\n', data).map_or(data.len(), |p| p + 1);
+    let body = &data[body_start..];
+    // Keep chunks big enough that scheduling overhead stays negligible
+    let target = (body.len() / n.max(1)).max(1 << 16);
+
+    let mut chunks = Vec::new();
+    let mut start = 0;
+    while start < body.len() {
+        let mut end = (start + target).min(body.len());
+        if end < body.len() {
+            end = memchr(b'\n', &body[end..]).map_or(body.len(), |p| end + p + 1);
+        }
+        chunks.push(&body[start..end]);
+        start = end;
+    }
+    chunks
+}
 
-    for (row_num, record) in records.iter().enumerate() {
-        if let Some(key) = record.get(&index_column) {
-            index.entry(key.clone())
-                .or_insert_with(Vec::new)
-                .push(row_num);
+/// Count rows per value of column `col`, one chunk of lines per core
+fn group_count_parallel(data: &[u8], col: usize) -> HashMap<String, usize> {
+    line_chunks(data, rayon::current_num_threads())
+        .into_par_iter()
+        .map(|chunk| {
+            let mut counts: AHashMap<Cow<[u8]>, usize> = AHashMap::new();
+            for line in chunk.split(|b| *b == b'\n').map(trim_cr) {
+                if line.is_empty() {
+                    continue;
+                }
+                if let Some(value) = nth_field(line, col) {
+                    *counts.entry(unquote(value)).or_insert(0) += 1;
+                }
+            }
+            counts
+        })
+        .reduce(AHashMap::new, |mut merged, counts| {
+            for (value, count) in counts {
+                *merged.entry(value).or_insert(0) += count;
+            }
+            merged
+        })
+        .into_iter()
+        .map(|(value, count)| (String::from_utf8_lossy(&value).into_owned(), count))
+        .collect()
+}
+
+/// Scan mapped data into `(row_count, key -> line offset)`
+///
+/// Later rows win for duplicate keys, matching how appends update the index.
+fn index_data(data: &[u8], key_col: Option<usize>) -> (usize, AHashMap<String, u64>) {
+    let mut index: AHashMap<String, u64> = AHashMap::new();
+    let mut row_count = 0;
+
+    for (offset, line) in data_lines(data) {
+        if let Some(key) = key_col.and_then(|col| nth_field(line, col)) {
+            if let Ok(key) = std::str::from_utf8(&unquote(key)) {
+                index.insert(key.to_string(), offset as u64);
+            }
         }
+        row_count += 1;
     }
 
-    // Convert back to standard HashMap for Python
-    Ok(index.into_iter().collect())
+    (row_count, index)
+}
+
+thread_local! {
+    /// Serialization buffer reused by batch writes on the same thread
+    static WRITE_BUF: RefCell<Vec<u8>> = RefCell::new(Vec::new());
+}
+
+/// Largest buffer kept around between batches
+const WRITE_BUF_KEEP: usize = 16 << 20;
+
+/// Run `f` with this thread's emptied write buffer, reserving `capacity` bytes
+///
+/// `f` must not call back into Python, which could re-enter a writer.
+fn with_write_buf<R>(capacity: usize, f: impl FnOnce(&mut Vec<u8>) -> R) -> R {
+    WRITE_BUF.with(|cell| {
+        let mut buf = cell.borrow_mut();
+        buf.clear();
+        buf.reserve(capacity);
+        let result = f(&mut buf);
+
+        // Don't pin the memory of an unusually large batch
+        if buf.capacity() > WRITE_BUF_KEEP {
+            *buf = Vec::new();
+        }
+        result
+    })
+}
+
+/// Write `n_rows` rows, fetching each cell with `field(row, col)`
+///
+/// Returns the byte offset each row starts at. Missing cells are written empty;
+/// values are normalized and quoted like `push_cell` does, so each row stays
+/// on one line.
+fn write_rows_with<'a, F>(
+    file_path: &str,
+    columns: &[String],
+    n_rows: usize,
+    field: F,
+    append: bool
+) -> io::Result<Vec<u64>>
+where
+    F: Fn(usize, usize) -> Option<&'a str>,
+{
+    let mut file = if append {
+        OpenOptions::new()
+            .create(true)
+            .append(true)
+            .open(file_path)?
+    } else {
+        File::create(file_path)?
+    };
+    let start = file.metadata()?.len();
+
+    // Serialize the whole batch into one buffer and hand it to a single write_all
+    with_write_buf(n_rows * (columns.len() * 8 + 1), |buf| {
+        if !append {
+            buf.extend_from_slice(columns.join("\t").as_bytes());
+            buf.push(b'\n');
+        }
+
+        let mut offsets = Vec::with_capacity(n_rows);
+        for row in 0..n_rows {
+            offsets.push(start + buf.len() as u64);
+            for col in 0..columns.len() {
+                if col > 0 {
+                    buf.push(b'\t');
+                }
+                if let Some(value) = field(row, col) {
+                    let cell = buf.len();
+                    push_text(buf, value.as_bytes());
+                    quote_cell(buf, cell);
+                }
+            }
+            buf.push(b'\n');
+        }
+
+        file.write_all(buf)?;
+        Ok(offsets)
+    })
+}
+
+/// Write column-ordered rows, returning the byte offset each row starts at
+fn write_rows(
+    file_path: &str,
+    columns: &[String],
+    rows: &[Vec<String>],
+    append: bool
+) -> io::Result<Vec<u64>> {
+    write_rows_with(
+        file_path,
+        columns,
+        rows.len(),
+        |row, col| rows[row].get(col).map(|s| s.as_str()),
+        append,
+    )
 }
 
 /// Ultra-fast filtering using parallel processing
@@ -128,14 +463,110 @@ fn filter_records_fast(
     Ok(results)
 }
 
+/// Hint the kernel about how `file` will be read (advisory, errors ignored)
+#[cfg(target_os = "linux")]
+fn fadvise(file: &File, advice: libc::c_int) {
+    use std::os::unix::io::AsRawFd;
+    unsafe {
+        libc::posix_fadvise(file.as_raw_fd(), 0, 0, advice);
+    }
+}
+
+/// Read a whole file into memory, through io_uring when built with `uring`
+fn read_whole_file(file_path: &str) -> io::Result<Vec<u8>> {
+    #[cfg(all(target_os = "linux", feature = "uring"))]
+    {
+        // Kernels without io_uring (or with it disabled) fail ring setup
+        if let Ok(data) = uring::read_file(file_path) {
+            return Ok(data);
+        }
+    }
+
+    let mut file = File::open(file_path)?;
+    #[cfg(target_os = "linux")]
+    fadvise(&file, libc::POSIX_FADV_SEQUENTIAL);
+
+    let mut data = Vec::with_capacity(file.metadata()?.len() as usize);
+    file.read_to_end(&mut data)?;
+    Ok(data)
+}
+
+/// Batched io_uring reads for cold-cache full scans (Linux only)
+#[cfg(all(target_os = "linux", feature = "uring"))]
+mod uring {
+    use io_uring::{opcode, types, IoUring};
+    use std::fs::File;
+    use std::io;
+    use std::os::unix::io::AsRawFd;
+
+    const CHUNK_SIZE: usize = 16 << 20;
+    const QUEUE_DEPTH: u32 = 256;
+
+    /// Read `file_path` with up to QUEUE_DEPTH 16MB reads in flight
+    pub fn read_file(file_path: &str) -> io::Result<Vec<u8>> {
+        let file = File::open(file_path)?;
+        super::fadvise(&file, libc::POSIX_FADV_SEQUENTIAL);
+        let len = file.metadata()?.len() as usize;
+        let mut buf = vec![0u8; len];
+        let mut ring = IoUring::new(QUEUE_DEPTH)?;
+        let fd = types::Fd(file.as_raw_fd());
+
+        let chunks: Vec<(usize, usize)> = (0..len)
+            .step_by(CHUNK_SIZE)
+            .map(|off| (off, CHUNK_SIZE.min(len - off)))
+            .collect();
+
+        for batch in chunks.chunks(QUEUE_DEPTH as usize) {
+            for (i, &(off, size)) in batch.iter().enumerate() {
+                let read = opcode::Read::new(fd, buf[off..].as_mut_ptr(), size as u32)
+                    .offset(off as u64)
+                    .build()
+                    .user_data(i as u64);
+                // Safety: `buf` outlives the submission and each chunk is disjoint
+                unsafe {
+                    ring.submission()
+                        .push(&read)
+                        .map_err(|_| io::Error::new(io::ErrorKind::Other, "io_uring queue full"))?;
+                }
+            }
+
+            ring.submit_and_wait(batch.len())?;
+
+            for cqe in ring.completion() {
+                let (_, size) = batch[cqe.user_data() as usize];
+                if cqe.result() < 0 {
+                    return Err(io::Error::from_raw_os_error(-cqe.result()));
+                }
+                if cqe.result() as usize != size {
+                    return Err(io::Error::new(io::ErrorKind::UnexpectedEof, "short io_uring read"));
+                }
+            }
+        }
+
+        Ok(buf)
+    }
+}
+
 /// Optimized TSV file reader with buffering
+///
+/// Full reads (`limit=None`) load the file in one go and split lines with
+/// memchr; limited reads stream only as many lines as needed.
 #[pyfunction]
 fn read_tsv_file(
     file_path: String,
     columns: Vec<String>,
     limit: Option<usize>
 ) -> PyResult<Vec<HashMap<String, String>>> {
+    if limit.is_none() {
+        let data = read_whole_file(&file_path)?;
+        let mut records = Vec::new();
+        scan_rows(&data, |line, bounds| records.push(row_map(line, bounds, &columns)));
+        return Ok(records);
+    }
+
     let file = File::open(file_path)?;
+    #[cfg(target_os = "linux")]
+    fadvise(&file, libc::POSIX_FADV_SEQUENTIAL);
     let reader = BufReader::with_capacity(65536, file);
     let mut records = Vec::new();
     let mut lines_read = 0;
@@ -148,7 +579,7 @@ fn read_tsv_file(
         }
 
         let line = line_result?;
-        let record = parse_tsv_line_fast(&line, columns.clone())?;
+        let record = parse_line_bytes(line.as_bytes(), &columns);
         records.push(record);
         lines_read += 1;
     }
@@ -157,46 +588,286 @@ fn read_tsv_file(
 }
 
 /// Batch write with large buffer for maximum speed
+///
+/// Rows arrive as column-ordered lists (matching `columns`), so no per-record
+/// dict has to be built on the Python side or hashed on the Rust side.
+/// Returns the byte offset at which each written row starts.
 #[pyfunction]
 fn write_tsv_batch_fast(
     file_path: String,
     columns: Vec<String>,
-    records: Vec<HashMap<String, String>>,
+    rows: Vec<Vec<String>>,
     append: bool
-) -> PyResult<usize> {
-    let file = if append {
-        OpenOptions::new()
-            .create(true)
-            .append(true)
-            .open(&file_path)?
+) -> PyResult<Vec<u64>> {
+    Ok(write_rows(&file_path, &columns, &rows, append)?)
+}
+
+/// Append one Python value as a TSV cell, normalized like `TSV._normalize_record`
+///
+/// `None` is empty, bools are "1"/"0", lists/dicts are JSON, everything else
+/// goes through `str()`. Tabs, newlines and carriage returns are cleaned out.
+fn push_cell(buf: &mut Vec<u8>, value: &PyAny) -> PyResult<()> {
+    if value.is_none() {
+        return Ok(());
+    }
+    if let Ok(flag) = value.downcast::<PyBool>() {
+        buf.push(if flag.is_true() { b'1' } else { b'0' });
+        return Ok(());
+    }
+
+    let text = if let Ok(text) = value.downcast::<PyString>() {
+        text.to_str()?
+    } else if value.is_instance_of::<PyList>() || value.is_instance_of::<PyDict>() {
+        value.py().import("json")?.call_method1("dumps", (value,))?.extract::<&str>()?
     } else {
-        File::create(&file_path)?
+        value.str()?.to_str()?
     };
 
-    // Use 256KB buffer for fast writes
-    let mut writer = BufWriter::with_capacity(262144, file);
+    push_text(buf, text.as_bytes());
+    Ok(())
+}
 
-    // If not appending, write header
-    if !append {
-        writeln!(writer, "{}", columns.join("\t"))?;
+/// Append a cell's text, normalized like `TSV._normalize_value`
+///
+/// Tabs become four spaces, newlines a space and `\r` is dropped, so a
+/// value can never split its row.
+fn push_text(buf: &mut Vec<u8>, bytes: &[u8]) {
+    if memchr3(b'\t', b'\n', b'\r', bytes).is_none() {
+        buf.extend_from_slice(bytes);
+        return;
     }
+    for &byte in bytes {
+        match byte {
+            b'\t' => buf.extend_from_slice(b"    "),
+            b'\n' => buf.push(b' '),
+            b'\r' => {}
+            _ => buf.push(byte),
+        }
+    }
+}
 
-    // Pre-allocate string buffer for each row
-    let mut row_buffer = String::with_capacity(1024);
+/// Quote the cell serialized at `buf[start..]` the way csv's QUOTE_MINIMAL does
+///
+/// Cells written with `push_text` are free of tabs and newlines, so only
+/// `"` needs quoting: it is doubled and the whole cell wrapped in quotes.
+/// Left unquoted, a leading `"` would make `csv.DictReader` swallow the
+/// following lines.
+fn quote_cell(buf: &mut Vec<u8>, start: usize) {
+    if memchr(b'"', &buf[start..]).is_none() {
+        return;
+    }
+    let cell = buf.split_off(start);
+    buf.push(b'"');
+    for byte in cell {
+        if byte == b'"' {
+            buf.push(b'"');
+        }
+        buf.push(byte);
+    }
+    buf.push(b'"');
+}
 
-    for record in &records {
-        row_buffer.clear();
-        for (i, col) in columns.iter().enumerate() {
-            if i > 0 {
-                row_buffer.push('\t');
+/// Serialize one row of Python values, indexing its first cell if asked
+///
+/// A non-empty first cell is appended to `index[value]` with `row`,
+/// read straight from the bytes just serialized. Cells are quoted like
+/// Python's csv writer, so `TSV` reads them back unchanged.
+fn push_row<'py, I>(
+    py: Python<'py>,
+    buf: &mut Vec<u8>,
+    cells: I,
+    index: Option<&PyDict>,
+    row: usize
+) -> PyResult<()>
+where
+    I: Iterator<Item = PyResult<Option<&'py PyAny>>>,
+{
+    let row_start = buf.len();
+    let mut n_cells = 0;
+    for (i, cell) in cells.enumerate() {
+        if i > 0 {
+            buf.push(b'\t');
+        }
+        let start = buf.len();
+        if let Some(value) = cell? {
+            push_cell(buf, value)?;
+        }
+
+        if let (0, Some(index)) = (i, index) {
+            if buf.len() > start {
+                let key = String::from_utf8_lossy(&buf[start..]);
+                match index.get_item(key.as_ref())? {
+                    Some(rows) => rows.downcast::<PyList>()?.append(row)?,
+                    None => index.set_item(key.as_ref(), PyList::new(py, [row]))?,
+                }
             }
-            row_buffer.push_str(record.get(col).unwrap_or(&String::new()));
         }
-        writeln!(writer, "{}", row_buffer)?;
+        quote_cell(buf, start);
+        n_cells += 1;
+    }
+
+    // A lone empty cell is written as "" (like csv) so the row isn't a blank
+    // line, which readers skip
+    if n_cells == 1 && buf.len() == row_start {
+        buf.extend_from_slice(b"\"\"");
+    }
+    buf.push(b'\n');
+    Ok(())
+}
+
+/// Rows serialized per write when streaming records from Python
+const STREAM_BATCH: usize = 1024;
+
+/// Serialize rows pulled from a Python iterable and append them to a file
+///
+/// `push` serializes one item as row `n`. The buffer is written (with the
+/// GIL released) every `STREAM_BATCH` rows, so a generator never has to be
+/// materialized and only whole rows ever reach the file.
+fn stream_to_file<'py, F>(
+    py: Python<'py>,
+    file_path: &str,
+    items: &'py PyAny,
+    mut push: F
+) -> PyResult<usize>
+where
+    F: FnMut(&mut Vec<u8>, &'py PyAny, usize) -> PyResult<()>,
+{
+    let mut file = OpenOptions::new()
+        .create(true)
+        .append(true)
+        .open(file_path)?;
+    let mut buf: Vec<u8> = Vec::with_capacity(STREAM_BATCH * 128);
+    let mut written = 0;
+
+    for item in items.iter()? {
+        push(&mut buf, item?, written)?;
+        written += 1;
+        if written % STREAM_BATCH == 0 {
+            py.allow_threads(|| file.write_all(&buf))?;
+            buf.clear();
+        }
     }
 
-    writer.flush()?;
-    Ok(records.len())
+    if !buf.is_empty() {
+        py.allow_threads(|| file.write_all(&buf))?;
+    }
+    Ok(written)
+}
+
+/// Append dict records straight from Python
+///
+/// Reads each record with `dict.get(column)` and serializes directly into
+/// a batch buffer, so Python never builds a normalized copy of the
+/// records. `records` may be any iterable, including a generator. When
+/// `index` is given, each non-empty first-column value is appended to
+/// `index[value]` with its row number (counting from `start_row`),
+/// matching `TSV.insert_many`. Returns the number of records written.
+#[pyfunction]
+#[pyo3(signature = (file_path, columns, records, index=None, start_row=0))]
+fn write_tsv_batch_pydicts(
+    py: Python,
+    file_path: String,
+    columns: Vec<String>,
+    records: &PyAny,
+    index: Option<&PyDict>,
+    start_row: usize
+) -> PyResult<usize> {
+    // Interned keys are created once per call and carry a cached hash, so
+    // the per-record lookups don't allocate a fresh str for every column
+    let keys: Vec<&PyString> = columns.iter().map(|col| PyString::intern(py, col)).collect();
+
+    stream_to_file(py, &file_path, records, |buf, item, n| {
+        let record: &PyDict = item.downcast()?;
+        let cells = keys.iter().map(|key| record.get_item(*key));
+        push_row(py, buf, cells, index, start_row + n)
+    })
+}
+
+/// Append positional rows (tuples or lists) straight from Python
+///
+/// Each row holds values in column order; short rows are padded with empty
+/// cells and extra values are dropped, like `TSV.insert_many_rows`. No dict
+/// is built or consulted per record. `rows` may be any iterable;
+/// `index`/`start_row` work as in `write_tsv_batch_pydicts`.
+#[pyfunction]
+#[pyo3(signature = (file_path, ncols, rows, index=None, start_row=0))]
+fn write_tsv_tuples(
+    py: Python,
+    file_path: String,
+    ncols: usize,
+    rows: &PyAny,
+    index: Option<&PyDict>,
+    start_row: usize
+) -> PyResult<usize> {
+    stream_to_file(py, &file_path, rows, |buf, item, n| {
+        if let Ok(row) = item.downcast::<PyTuple>() {
+            let cells = (0..ncols).map(|i| Ok(row.get_item(i).ok()));
+            push_row(py, buf, cells, index, start_row + n)
+        } else {
+            let row: &PyList = item.downcast()?;
+            let cells = (0..ncols).map(|i| Ok(row.get_item(i).ok()));
+            push_row(py, buf, cells, index, start_row + n)
+        }
+    })
+}
+
+/// Filter column lists and return the indices of matching rows
+///
+/// Each filter is a `(column_values, wanted)` pair, where `column_values`
+/// is a Python list of str (or None). Cells are compared through their cached UTF-8
+/// buffers, so no per-row dict or String is created.
+#[pyfunction]
+fn filter_columns(filters: Vec<(&PyList, String)>, n_rows: usize) -> PyResult<Vec<usize>> {
+    let mut hits: Vec<usize> = (0..n_rows).collect();
+
+    for (values, wanted) in &filters {
+        let mut kept = Vec::with_capacity(hits.len());
+        for &row in &hits {
+            // Short rows are padded with None, which never matches
+            if let Ok(cell) = values.get_item(row)?.downcast::<PyString>() {
+                if cell.to_str()? == wanted.as_str() {
+                    kept.push(row);
+                }
+            }
+        }
+        hits = kept;
+        if hits.is_empty() {
+            break;
+        }
+    }
+
+    Ok(hits)
+}
+
+/// Scan a TSV file and build dicts only for rows matching every condition
+///
+/// Conditions are compared against the raw field bytes in the same memchr
+/// pass that splits the row, so nothing is allocated for rejected rows.
+#[pyfunction]
+fn scan_and_filter(
+    py: Python,
+    file_path: String,
+    columns: Vec<String>,
+    conditions: HashMap<String, String>
+) -> PyResult<Vec<HashMap<String, String>>> {
+    let resolved = match resolve_conditions(&columns, &conditions) {
+        Some(resolved) => resolved,
+        None => return Ok(Vec::new()),
+    };
+
+    let results = py.allow_threads(|| -> io::Result<Vec<HashMap<String, String>>> {
+        let file = File::open(&file_path)?;
+        let mmap = unsafe { Mmap::map(&file)? };
+
+        let mut results = Vec::new();
+        scan_rows(&mmap, |line, bounds| {
+            if !line.is_empty() && row_matches(line, bounds, &resolved) {
+                results.push(row_map(line, bounds, &columns));
+            }
+        });
+        Ok(results)
+    })?;
+    Ok(results)
 }
 
 /// Count matching records without materializing results
@@ -260,6 +931,53 @@ fn group_by_count(
     Ok(counts.into_iter().collect())
 }
 
+/// Map each distinct value of a column to the data rows holding it
+///
+/// Row numbers count non-empty lines after the header, the same order
+/// `TSV._load_columns` sees them in.
+#[pyfunction]
+fn build_column_index(
+    py: Python,
+    file_path: String,
+    columns: Vec<String>,
+    column: String
+) -> PyResult<HashMap<String, Vec<usize>>> {
+    let col = match columns.iter().position(|c| *c == column) {
+        Some(col) => col,
+        None => return Ok(HashMap::new()),
+    };
+
+    // Pure Rust from here on - let other Python threads run during the scan
+    let index = py.allow_threads(|| -> io::Result<AHashMap<Vec<u8>, Vec<usize>>> {
+        let file = File::open(&file_path)?;
+        let mmap = unsafe { Mmap::map(&file)? };
+
+        let mut index: AHashMap<Vec<u8>, Vec<usize>> = AHashMap::new();
+        let mut row = 0;
+        scan_rows(&mmap, |line, bounds| {
+            if line.is_empty() {
+                return;
+            }
+            if let Some(value) = field_at(line, bounds, col) {
+                // Only allocate a key the first time a value is seen
+                match index.get_mut(value.as_ref()) {
+                    Some(rows) => rows.push(row),
+                    None => {
+                        index.insert(value.into_owned(), vec![row]);
+                    }
+                }
+            }
+            row += 1;
+        });
+        Ok(index)
+    })?;
+
+    Ok(index
+        .into_iter()
+        .map(|(value, rows)| (String::from_utf8_lossy(&value).into_owned(), rows))
+        .collect())
+}
+
 /// Aggregate sum of numeric column grouped by another column
 #[pyfunction]
 fn group_by_sum(
@@ -280,18 +998,274 @@ fn group_by_sum(
     Ok(sums.into_iter().collect())
 }
 
+/// Look up many ids with a single pass over the memory-mapped file
+///
+/// Returns one entry per requested id (in request order), `None` when the id
+/// is not present. Replaces N separate `query_one` round trips.
+#[pyfunction]
+fn query_many_by_id(
+    file_path: String,
+    columns: Vec<String>,
+    ids: Vec<String>
+) -> PyResult<Vec<Option<HashMap<String, String>>>> {
+    let file = File::open(&file_path)?;
+    let mmap = unsafe { Mmap::map(&file)? };
+    let data = &mmap[..];
+    let id_col = columns.iter().position(|c| c == "id").unwrap_or(0);
+
+    // Map each wanted id to its positions in the request
+    let mut wanted: AHashMap<&[u8], Vec<usize>> = AHashMap::with_capacity(ids.len());
+    for (pos, id) in ids.iter().enumerate() {
+        wanted.entry(id.as_bytes()).or_insert_with(Vec::new).push(pos);
+    }
+
+    let mut results: Vec<Option<HashMap<String, String>>> = vec![None; ids.len()];
+
+    // Stop as soon as every id has been found
+    for (_, line) in data_lines(data) {
+        if wanted.is_empty() {
+            break;
+        }
+        if let Some(key) = nth_field(line, id_col) {
+            if let Some(positions) = wanted.remove(unquote(key).as_ref()) {
+                let record = parse_line_bytes(line, &columns);
+                for pos in positions {
+                    results[pos] = Some(record.clone());
+                }
+            }
+        }
+    }
+
+    Ok(results)
+}
+
+/// A TSV table that keeps its file memory-mapped between calls
+///
+/// The mapping is created lazily on first read and dropped whenever this
+/// table appends rows or the file's length or mtime changes, so repeated
+/// queries reuse one mapping instead of re-reading the whole file each time.
+#[pyclass]
+struct RustTable {
+    path: PathBuf,
+    columns: Vec<String>,
+    mmap: RwLock<Option<Mapping>>,
+}
+
+/// A mapping of the data file and the `(length, mtime)` it was made at
+struct Mapping {
+    mmap: Arc<Mmap>,
+    state: (u64, Option<SystemTime>),
+}
+
+impl RustTable {
+    /// Current mapping of the data file, remapping it if the file has changed
+    ///
+    /// Other processes may append to or rewrite the file, so its length and
+    /// mtime are checked on every call, not only after this table's writes.
+    fn data(&self) -> PyResult<Arc<Mmap>> {
+        let meta = std::fs::metadata(&self.path)?;
+        let state = (meta.len(), meta.modified().ok());
+        if let Some(mapping) = self.mmap.read().unwrap().as_ref() {
+            if mapping.state == state {
+                return Ok(Arc::clone(&mapping.mmap));
+            }
+        }
+
+        let mut slot = self.mmap.write().unwrap();
+        if let Some(mapping) = slot.as_ref() {
+            if mapping.state == state {
+                return Ok(Arc::clone(&mapping.mmap));
+            }
+        }
+        let file = File::open(&self.path)?;
+        let mmap = Arc::new(unsafe { Mmap::map(&file)? });
+        *slot = Some(Mapping { mmap: Arc::clone(&mmap), state });
+        Ok(mmap)
+    }
+
+    /// `data()` hinted for point reads, so a lookup doesn't drag in readahead
+    ///
+    /// Hints are advisory and failures are ignored.
+    fn point_data(&self) -> PyResult<Arc<Mmap>> {
+        let data = self.data()?;
+        #[cfg(unix)]
+        let _ = data.advise(Advice::Random);
+        Ok(data)
+    }
+
+    /// `data()` hinted for a full scan, undoing any earlier `point_data` hint
+    fn scan_data(&self) -> PyResult<Arc<Mmap>> {
+        let data = self.data()?;
+        #[cfg(unix)]
+        let _ = data.advise(Advice::Sequential);
+        Ok(data)
+    }
+
+    fn invalidate(&self) {
+        *self.mmap.write().unwrap() = None;
+    }
+}
+
+#[pymethods]
+impl RustTable {
+    #[new]
+    fn new(file_path: String, columns: Vec<String>) -> Self {
+        RustTable {
+            path: PathBuf::from(file_path),
+            columns,
+            mmap: RwLock::new(None),
+        }
+    }
+
+    /// Append column-ordered rows
+    ///
+    /// Returns `(key, offset)` pairs for `index_column`, built while writing,
+    /// so the caller can merge them with a single `dict.update`.
+    #[pyo3(signature = (rows, index_column=None))]
+    fn insert_many(
+        &self,
+        rows: Vec<Vec<String>>,
+        index_column: Option<String>
+    ) -> PyResult<Vec<(String, u64)>> {
+        let mut rows = rows;
+        let path = self.path.to_string_lossy();
+        let offsets = write_rows(&path, &self.columns, &rows, true)?;
+        self.invalidate();
+
+        let key_col = index_column.and_then(|name| self.columns.iter().position(|c| *c == name));
+        Ok(match key_col {
+            Some(col) => rows
+                .iter_mut()
+                .zip(offsets)
+                .filter(|(row, _)| col < row.len())
+                .map(|(row, offset)| (std::mem::take(&mut row[col]), offset))
+                .collect(),
+            None => Vec::new(),
+        })
+    }
+
+    /// Append column-oriented data: one list of values per table column
+    ///
+    /// Same result as `insert_many`, but the caller never builds per-row
+    /// containers; rows are assembled by zipping the column lists while writing.
+    #[pyo3(signature = (data, index_column=None))]
+    fn insert_columns(
+        &self,
+        data: Vec<Vec<String>>,
+        index_column: Option<String>
+    ) -> PyResult<Vec<(String, u64)>> {
+        let mut data = data;
+        let n_rows = data.iter().map(|values| values.len()).max().unwrap_or(0);
+        let path = self.path.to_string_lossy();
+        let offsets = write_rows_with(
+            &path,
+            &self.columns,
+            n_rows,
+            |row, col| data.get(col).and_then(|values| values.get(row)).map(|s| s.as_str()),
+            true,
+        )?;
+        self.invalidate();
+
+        let key_col = index_column.and_then(|name| self.columns.iter().position(|c| *c == name));
+        Ok(match key_col.filter(|col| *col < data.len()) {
+            Some(col) => std::mem::take(&mut data[col]).into_iter().zip(offsets).collect(),
+            None => Vec::new(),
+        })
+    }
+
+    /// Build `(row_count, key -> line offset)` for `index_column`
+    fn build_index(&self, index_column: String) -> PyResult<(usize, HashMap<String, u64>)> {
+        let data = self.scan_data()?;
+        let key_col = self.columns.iter().position(|c| *c == index_column);
+        let (row_count, index) = index_data(&data, key_col);
+        Ok((row_count, index.into_iter().collect()))
+    }
+
+    /// Read the record at `offset` as positional fields (column order)
+    fn read_record_at(&self, offset: u64) -> PyResult<Option<Vec<String>>> {
+        let data = self.point_data()?;
+        Ok(line_at(&data, offset as usize).map(|line| split_fields(line, self.columns.len())))
+    }
+
+    /// Read many records by offset; `None` offsets yield `None`
+    fn read_many_at(&self, offsets: Vec<Option<u64>>) -> PyResult<Vec<Option<HashMap<String, String>>>> {
+        let data = self.point_data()?;
+        Ok(offsets
+            .iter()
+            .map(|offset| {
+                offset
+                    .and_then(|off| line_at(&data, off as usize))
+                    .map(|line| parse_line_bytes(line, &self.columns))
+            })
+            .collect())
+    }
+
+    /// Records matching all `column == value` conditions, as positional lists
+    ///
+    /// Rows come back in column order; no dict is built per match.
+    fn query_rows(&self, conditions: HashMap<String, String>) -> PyResult<Vec<Vec<String>>> {
+        let data = self.scan_data()?;
+        let resolved = match resolve_conditions(&self.columns, &conditions) {
+            Some(resolved) => resolved,
+            None => return Ok(Vec::new()),
+        };
+
+        let ncols = self.columns.len();
+        let mut rows = Vec::new();
+        scan_rows(&data, |line, bounds| {
+            if row_matches(line, bounds, &resolved) {
+                rows.push(row_fields(line, bounds, ncols));
+            }
+        });
+        Ok(rows)
+    }
+
+    /// Count records matching all conditions without materializing them
+    fn count(&self, conditions: HashMap<String, String>) -> PyResult<usize> {
+        let data = self.scan_data()?;
+        let resolved = match resolve_conditions(&self.columns, &conditions) {
+            Some(resolved) => resolved,
+            None => return Ok(0),
+        };
+
+        let mut count = 0;
+        scan_rows(&data, |line, bounds| {
+            if row_matches(line, bounds, &resolved) {
+                count += 1;
+            }
+        });
+        Ok(count)
+    }
+
+    /// Group by a column and count occurrences (parallel over the mapping)
+    fn group_by_count(&self, column: String) -> PyResult<HashMap<String, usize>> {
+        let col = match self.columns.iter().position(|c| *c == column) {
+            Some(col) => col,
+            None => return Ok(HashMap::new()),
+        };
+        let data = self.scan_data()?;
+        Ok(group_count_parallel(&data, col))
+    }
+}
+
 /// Python module definition
 #[pymodule]
 fn dbbasic_rust(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(parse_tsv_line_fast, m)?)?;
     m.add_function(wrap_pyfunction!(parse_tsv_batch_fast, m)?)?;
-    m.add_function(wrap_pyfunction!(build_index, m)?)?;
     m.add_function(wrap_pyfunction!(filter_records_fast, m)?)?;
     m.add_function(wrap_pyfunction!(read_tsv_file, m)?)?;
     m.add_function(wrap_pyfunction!(write_tsv_batch_fast, m)?)?;
+    m.add_function(wrap_pyfunction!(write_tsv_batch_pydicts, m)?)?;
+    m.add_function(wrap_pyfunction!(write_tsv_tuples, m)?)?;
+    m.add_function(wrap_pyfunction!(filter_columns, m)?)?;
+    m.add_function(wrap_pyfunction!(scan_and_filter, m)?)?;
     m.add_function(wrap_pyfunction!(count_matching_fast, m)?)?;
     m.add_function(wrap_pyfunction!(unique_values, m)?)?;
     m.add_function(wrap_pyfunction!(group_by_count, m)?)?;
     m.add_function(wrap_pyfunction!(group_by_sum, m)?)?;
+    m.add_function(wrap_pyfunction!(build_column_index, m)?)?;
+    m.add_function(wrap_pyfunction!(query_many_by_id, m)?)?;
+    m.add_class::<RustTable>()?;
     Ok(())
 }
\ No newline at end of file
@@ -39,6 +39,18 @@ class TestBasicOperations(unittest.TestCase):
         self.assertEqual(count, 3)
         self.assertEqual(self.db.count(), 3)
 
+    def test_insert_many_rows(self):
+        """Test positional batch insertion"""
+        count = self.db.insert_many_rows([
+            ("1", "Alice", "alice@example.com"),
+            ["2", "Bob"],
+            ("3", "Charlie\tC", "charlie@example.com", "extra"),
+        ])
+        self.assertEqual(count, 3)
+        self.assertEqual(self.db.query_one(id="2")["email"], "")
+        self.assertEqual(self.db.query_one(id="3")["name"], "Charlie    C")
+        self.assertEqual(self.db.query(email="alice@example.com")[0]["name"], "Alice")
+
     def test_query(self):
         """Test querying records"""
         self.db.insert({"id": "1", "name": "Alice", "email": "alice@example.com"})
@@ -53,6 +65,15 @@ class TestBasicOperations(unittest.TestCase):
         results = self.db.query()
         self.assertEqual(len(results), 2)
 
+        # Query on several non-key columns
+        results = self.db.query(name="Bob", email="bob@example.com")
+        self.assertEqual(results, [{"id": "2", "name": "Bob", "email": "bob@example.com"}])
+        self.assertEqual(self.db.query(name="Bob", email="alice@example.com"), [])
+
+        # Column indexes follow later writes
+        self.db.insert({"id": "3", "name": "Bob", "email": "bob2@example.com"})
+        self.assertEqual([r["id"] for r in self.db.query(name="Bob")], ["2", "3"])
+
     def test_query_one(self):
         """Test querying single record"""
         self.db.insert({"id": "1", "name": "Alice", "email": "alice@example.com"})
@@ -113,6 +134,19 @@ class TestBasicOperations(unittest.TestCase):
         all_records = list(self.db.all())
         self.assertEqual(len(all_records), 5)
 
+    def test_all_sees_writes(self):
+        """Test that scans pick up inserts, updates and deletes"""
+        self.db.insert({"id": "1", "name": "Alice", "email": "alice@example.com"})
+        self.assertEqual([r["name"] for r in self.db.all()], ["Alice"])
+
+        self.db.insert({"id": "2", "name": "Bob", "email": "bob@example.com"})
+        self.db.update({"id": "1"}, {"name": "Alicia"})
+        self.assertEqual([r["name"] for r in self.db.all()], ["Alicia", "Bob"])
+
+        self.db.delete(id="2")
+        self.assertEqual(len(self.db.query(name="Bob")), 0)
+        self.assertEqual(len(self.db.query(name="Alicia")), 1)
+
     def test_truncate(self):
         """Test truncating table"""
         self.db.insert({"id": "1", "name": "Alice", "email": "alice@example.com"})
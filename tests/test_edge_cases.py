@@ -3,6 +3,7 @@
 Edge case tests for dbbasic-tsv
 """
 
+import os
 import unittest
 import tempfile
 import shutil
@@ -180,6 +181,36 @@ class TestDataIntegrity(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(result["email"], "user50@example.com")
 
+    def test_legacy_json_index_is_rebuilt(self):
+        """Test that an old JSON index file is replaced instead of trusted"""
+        db1 = TSV("legacy_index", ["id", "name"], data_dir=self.test_dir)
+        db1.insert_many([{"id": "1", "name": "Alice"}, {"id": "2", "name": "Bob"}])
+        del db1
+
+        index_file = self.test_dir / "legacy_index.idx"
+        index_file.write_text('{"index": {"1": [5]}, "row_count": 9}')
+
+        db2 = TSV("legacy_index", ["id", "name"], data_dir=self.test_dir)
+        self.assertEqual(db2.count(), 2)
+        self.assertEqual(db2.query_one(id="2")["name"], "Bob")
+        self.assertTrue(index_file.read_bytes().startswith(b"DBTSVIX1"))
+
+    def test_column_cache_after_same_size_rewrite(self):
+        """Test that a rewrite the file's stat can't see still refreshes column queries"""
+        db = TSV("same_size", ["id", "city"], data_dir=self.test_dir)
+        db.insert_many([{"id": "1", "city": "Paris"}])
+        self.assertEqual(len(db.query(city="Paris")), 1)
+
+        # Same size, and the old mtime put back, as with a coarse mtime clock
+        st = os.stat(db.data_file)
+        db.truncate()
+        db.insert_many([{"id": "2", "city": "Tokyo"}])
+        os.utime(db.data_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(os.stat(db.data_file).st_size, st.st_size)
+
+        self.assertEqual(db.query(city="Paris"), [])
+        self.assertEqual(db.query(city="Tokyo"), [{"id": "2", "city": "Tokyo"}])
+
     def test_data_file_format(self):
         """Test that data file is valid TSV format"""
         db = TSV("format_test", ["id", "name", "email"], data_dir=self.test_dir)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Tests for the optional Rust extension (dbbasic_rust)
+"""
+
+import unittest
+import tempfile
+import shutil
+import importlib.util
+from collections import Counter
+from pathlib import Path
+from dbbasic import TSV
+
+try:
+    import dbbasic_rust
+    RUST_AVAILABLE = True
+except ImportError:
+    RUST_AVAILABLE = False
+
+
+def load_benchmark(name):
+    """Import a module from benchmarks/ without adding that directory to sys.path"""
+    path = Path(__file__).parent.parent / "benchmarks" / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@unittest.skipUnless(RUST_AVAILABLE, "dbbasic_rust extension not built")
+class TestRustWriters(unittest.TestCase):
+    """Files written by the Rust writers must read back through TSV"""
+
+    def setUp(self):
+        """Create temporary directory and test table"""
+        self.test_dir = Path(tempfile.mkdtemp(prefix="dbbasic_test_"))
+        self.db = TSV("test_rust", ["id", "name", "age"], data_dir=self.test_dir)
+
+    def tearDown(self):
+        """Clean up test directory"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, writer, layout, items):
+        """Append items with a Rust writer, indexing them like RustAcceleratedTSV"""
+        db = self.db
+        written = writer(str(db.data_file), layout, items, db.index, db.row_count)
+        db.row_count += written
+        return written
+
+    def test_quotes_round_trip(self):
+        """Values containing quotes are written the way csv would"""
+        records = [
+            {"id": "1", "name": '"abc', "age": "30"},
+            {"id": "2", "name": 'O"Brien', "age": "40"},
+            {"id": "3", "name": "plain", "age": "50"},
+        ]
+        written = self.write(dbbasic_rust.write_tsv_batch_pydicts, self.db.columns, records)
+        self.assertEqual(written, 3)
+
+        rows = [('4', '"quoted"', '60'), ('5', 'x"y', '70')]
+        written = self.write(dbbasic_rust.write_tsv_tuples, len(self.db.columns), rows)
+        self.assertEqual(written, 2)
+
+        db = self.db
+        self.assertEqual(
+            [row["name"] for row in db.all()],
+            ['"abc', 'O"Brien', "plain", '"quoted"', 'x"y'],
+        )
+        self.assertEqual(db.query_one(id="3")["name"], "plain")
+        self.assertEqual(db.query_one(id="5")["age"], "70")
+        self.assertEqual(db.query_one(name='O"Brien')["id"], "2")
+
+
+@unittest.skipUnless(RUST_AVAILABLE, "dbbasic_rust extension not built")
+class TestRustReaders(unittest.TestCase):
+    """Rust scans must agree with TSV on rows written from Python"""
+
+    def setUp(self):
+        """Create a table written by the csv module (CRLF line endings)"""
+        self.test_dir = Path(tempfile.mkdtemp(prefix="dbbasic_test_"))
+        self.db = TSV("test_rust", ["id", "name", "created"], data_dir=self.test_dir)
+        self.db.insert({"id": "1", "name": 'O"Brien', "created": "x"})
+        self.db.insert_many([
+            {"id": "2", "name": '"abc', "created": "y"},
+            {"id": "3", "name": "plain", "created": "x"},
+            {"id": "4", "name": 'O"Brien', "created": "y"},
+        ])
+
+    def tearDown(self):
+        """Clean up test directory"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_build_column_index(self):
+        """Keys match the Python index: no trailing CR, no csv quoting"""
+        self.db._load_columns()
+        for column in self.db.columns:
+            self.assertEqual(
+                dbbasic_rust.build_column_index(str(self.db.data_file), self.db.columns, column),
+                TSV._build_column_index(self.db, column),
+            )
+
+    def test_read_tsv_file(self):
+        """Full and limited reads both return what TSV.all does"""
+        path = str(self.db.data_file)
+        expected = [dict(row) for row in self.db.all()]
+        self.assertEqual(dbbasic_rust.read_tsv_file(path, self.db.columns, None), expected)
+        self.assertEqual(dbbasic_rust.read_tsv_file(path, self.db.columns, 100), expected)
+        self.assertEqual(dbbasic_rust.read_tsv_file(path, self.db.columns, 2), expected[:2])
+
+    def test_parse_tsv_batch_fast(self):
+        """Batch parsing matches parse_tsv_line_fast on raw file lines"""
+        with open(self.db.data_file, newline="", encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f][1:]
+        lines.append("5\tlast\t")
+        columns = self.db.columns
+        self.assertEqual(
+            dbbasic_rust.parse_tsv_batch_fast(lines, columns),
+            [dbbasic_rust.parse_tsv_line_fast(line, columns) for line in lines],
+        )
+        self.assertEqual(
+            dbbasic_rust.parse_tsv_batch_fast(lines[:1], columns),
+            [{"id": "1", "name": 'O"Brien', "created": "x"}],
+        )
+        self.assertEqual(
+            dbbasic_rust.parse_tsv_batch_fast(lines[-1:], columns),
+            [{"id": "5", "name": "last", "created": ""}],
+        )
+
+    def test_query_many_by_id(self):
+        """Batched id lookups return what query_one does"""
+        ids = ["4", "1", "missing", "2"]
+        self.assertEqual(
+            dbbasic_rust.query_many_by_id(str(self.db.data_file), self.db.columns, ids),
+            [self.db.query_one(id=i) for i in ids],
+        )
+
+    def test_rust_query_matches_python(self):
+        """RustAcceleratedTSV.query agrees with TSV.query, cold (Rust scan) and warm"""
+        RustAcceleratedTSV = load_benchmark("rust_vs_sqlite").RustAcceleratedTSV
+
+        queries = [
+            {"name": 'O"Brien', "created": "y"},
+            {"name": '"abc', "created": "y"},
+            {"id": "3", "created": "x"},
+            {"name": "plain", "created": "y"},
+        ]
+        for conditions in queries:
+            expected = TSV.query(self.db, **conditions)
+
+            # A pinned threshold skips calibration (and its cache file)
+            table = RustAcceleratedTSV(
+                "test_rust", self.db.columns, data_dir=self.test_dir, query_threshold=0
+            )
+            self.assertEqual(table._rust_query(conditions), expected)
+
+            # First query goes to the Rust scan, the next to the column indexes
+            self.assertEqual(table.query(**conditions), expected)
+            self.assertEqual(table.query(**conditions), expected)
+
+
+@unittest.skipUnless(RUST_AVAILABLE, "dbbasic_rust extension not built")
+class TestRustTable(unittest.TestCase):
+    """RustTable reads back what it writes and agrees with TSV"""
+
+    def setUp(self):
+        """Create a table whose header was written by the csv module"""
+        self.test_dir = Path(tempfile.mkdtemp(prefix="dbbasic_test_"))
+        self.columns = ["id", "name", "city"]
+        self.db = TSV("test_rust", self.columns, data_dir=self.test_dir)
+        self.table = dbbasic_rust.RustTable(str(self.db.data_file), self.columns)
+
+    def tearDown(self):
+        """Clean up test directory"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_offsets_round_trip(self):
+        """Rows read back at the offsets insert_many/insert_columns return"""
+        keys = self.table.insert_many(
+            [["1", 'O"Brien', "Paris"], ["2", "tab\there", "Tokyo"], ["3", "plain", ""]],
+            "id",
+        )
+        keys += self.table.insert_columns([["4", "5"], ["x", '"y"'], ["Rome"]], "id")
+        self.assertEqual([key for key, _ in keys], ["1", "2", "3", "4", "5"])
+
+        expected = [
+            ["1", 'O"Brien', "Paris"],
+            ["2", "tab    here", "Tokyo"],
+            ["3", "plain", ""],
+            ["4", "x", "Rome"],
+            ["5", '"y"', ""],
+        ]
+        offsets = [offset for _, offset in keys]
+        for offset, row in zip(offsets, expected):
+            self.assertEqual(self.table.read_record_at(offset), row)
+        self.assertEqual(
+            self.table.read_many_at(offsets + [None]),
+            [dict(zip(self.columns, row)) for row in expected] + [None],
+        )
+
+        row_count, index = self.table.build_index("id")
+        self.assertEqual(row_count, 5)
+        self.assertEqual(index, dict(keys))
+
+        # TSV reads the same rows back from the file
+        self.assertEqual([list(row.values()) for row in self.db.all()], expected)
+
+    def test_group_by_count(self):
+        """Counts match collections.Counter across several parallel chunks"""
+        cities = ["Paris", "Tokyo", 'Q"town', "Rome", ""]
+        rows = [[str(i), f"user{i}", cities[i * 7 % 5]] for i in range(20000)]
+        self.table.insert_many(rows)
+        counts = Counter(row[2] for row in rows)
+        self.assertEqual(self.table.group_by_count("city"), dict(counts))
+        self.assertEqual(self.table.count({"city": "Tokyo"}), counts["Tokyo"])
+
+    def test_query_rows_matches_tsv(self):
+        """query_rows and count agree with TSV.query on quoted, CRLF data"""
+        # Map the file first so the Python writes below must trigger a remap
+        self.assertEqual(self.table.query_rows({"city": "x"}), [])
+        self.db.insert({"id": "1", "name": 'O"Brien', "city": "x"})
+        self.db.insert_many([
+            {"id": "2", "name": '"abc', "city": "y"},
+            {"id": "3", "name": "plain", "city": "x"},
+            {"id": "4", "name": 'O"Brien', "city": "y"},
+        ])
+
+        for conditions in [
+            {"city": "x"},
+            {"name": 'O"Brien'},
+            {"name": '"abc', "city": "y"},
+            {"name": "missing"},
+        ]:
+            expected = [list(row.values()) for row in self.db.query(**conditions)]
+            self.assertEqual(self.table.query_rows(conditions), expected)
+            self.assertEqual(self.table.count(conditions), len(expected))
+
+
+@unittest.skipUnless(RUST_AVAILABLE, "dbbasic_rust extension not built")
+class TestRustOptimizedTSV(unittest.TestCase):
+    """RustOptimizedTSV's result cache and .idx sidecar"""
+
+    def setUp(self):
+        """Create temporary directory"""
+        self.test_dir = Path(tempfile.mkdtemp(prefix="dbbasic_test_"))
+        self.RustOptimizedTSV = load_benchmark("rust_optimized").RustOptimizedTSV
+        self.columns = ["id", "name", "city"]
+
+    def tearDown(self):
+        """Clean up test directory"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def open(self):
+        """Open (or reopen) the test table"""
+        return self.RustOptimizedTSV("opt", self.columns, data_dir=self.test_dir)
+
+    def append_line(self, db, line):
+        """Append a row the way another process would, behind db's back"""
+        with open(db.data_file, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def test_result_cache(self):
+        """Cached results are copies, bounded, and dropped when the file changes"""
+        db = self.open()
+        db.insert_many([
+            {"id": str(i), "name": f"n{i}", "city": "Paris" if i % 2 else "Rome"}
+            for i in range(10)
+        ])
+
+        rows = db.query_rows(city="Paris")
+        self.assertEqual(len(rows), 5)
+        rows.clear()
+        rows = db.query_rows(city="Paris")
+        self.assertEqual(len(rows), 5)
+        rows[0][1] = "changed"
+        self.assertEqual(db.query_rows(city="Paris")[0][1], "n1")
+
+        db.max_cache_size = 2
+        for i in range(4):
+            db.query_rows(name=f"n{i}")
+        self.assertEqual(len(db._result_cache), 2)
+
+        self.append_line(db, "10\tn10\tParis\n")
+        self.assertEqual(len(db.query_rows(city="Paris")), 6)
+
+    def test_index_sidecar(self):
+        """The .idx file is reused while current and rebuilt once stale"""
+        db = self.open()
+        db.insert_many([{"id": str(i), "name": f"n{i}", "city": "Rome"} for i in range(3)])
+        self.assertTrue(db.index_file.exists())
+
+        reopened = self.open()
+        self.assertEqual(reopened.row_count, 3)
+        self.assertEqual(reopened.index, db.index)
+        self.assertEqual(reopened.query_one(id="2"), {"id": "2", "name": "n2", "city": "Rome"})
+
+        self.append_line(db, "9\tn9\tParis\n")
+        stale = self.open()
+        self.assertEqual(stale.row_count, 4)
+        self.assertEqual(stale.query_one(id="9"), {"id": "9", "name": "n9", "city": "Paris"})
+        self.assertEqual(stale.query_many(["0", "9", "missing"])[1]["city"], "Paris")
+
+
+if __name__ == "__main__":
+    unittest.main()